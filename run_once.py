@@ -1,6 +1,22 @@
-import os, requests, feedparser, pytz, json, time
-from datetime import datetime
-from apscheduler.schedulers.blocking import BlockingScheduler
+import os, re, requests, json, sched, sqlite3, threading, time
+import atexit
+import functools, hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from xml.etree import ElementTree
+from zoneinfo import ZoneInfo
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj):
+        return json.dumps(obj).encode("utf-8")
 
 # --- تنظیمات ---
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -8,127 +24,585 @@ CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 NEWS_FEED_URL = "https://cryptonews.com/news/feed"
 HF_MODEL = "facebook/bart-large-cnn"
 HF_TOKEN = os.getenv("HF_TOKEN")
+CHANNEL_FOOTER = "👥 @Crypto_Zone360\nبه ما بپیوندید 🦈"
+
+# --- نشست HTTP مشترک (keep-alive + connection pool) ---
+SESSION = requests.Session()
+SESSION.headers["User-Agent"] = "TheGodBot/1.0 (+https://github.com/TheAliAgha/TheGodBot)"
+# خطای اتصال و 5xx با backoff کوتاه دوباره تلاش می‌شوند (POST خلاصه‌سازی HF هم شامل است)؛
+# read timeout تکرار نمی‌شود تا یک درخواست کند چند برابر timeout خودش معطل نکند.
+# 429 بدون retry به check_rate_limit می‌رسد و Retry-After طولانی thread را قفل نمی‌کند
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=Retry(
+    total=3, read=0, backoff_factor=0.5, status_forcelist=[502, 503, 504],
+    allowed_methods=None, raise_on_status=False, respect_retry_after_header=False
+)))
+# ارسال‌های تلگرام ترتیبی‌اند؛ همه روی یک اتصال TLS باز می‌مانند
+SESSION.mount("https://api.telegram.org/", HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=Retry(total=2, backoff_factor=0.3)))
+
+# بدنه پاسخ مستقیم از bytes پارس می‌شود (orjson اگر نصب باشد)
+def _json(resp):
+    return _loads(resp.content)
+
+# 429 بعد از تمام شدن retryهای نشست؛ کارهای باقی‌مانده‌ی همان سرویس رها می‌شوند
+class RateLimited(Exception):
+    pass
+
+def check_rate_limit(resp, service):
+    if resp.status_code == 429:
+        raise RateLimited(f"{service} rate limited (429)")
+
+# --- اجرای موازی درخواست‌های هر خبر ---
+EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+# --- کش پایدار ترجمه و خلاصه (بین اجراها) ---
+CACHE_FILE = ".llm_cache.sqlite3"
+CACHE_TTL = 7 * 24 * 3600  # ثانیه
+CACHE_MAX_ENTRIES = 5000
+CACHE_PRUNE_EVERY = 500  # هر چند نوشتن یک بار پاکسازی
+_cache_db = None  # با اولین استفاده باز می‌شود، نه هنگام import
+_cache_lock = threading.Lock()
+_cache_puts = 0
+
+def _cache_key(name, text):
+    return hashlib.sha1(f"{name}|{text[:3000]}".encode("utf-8")).hexdigest()
+
+# منقضی‌ها و قدیمی‌ترین‌های بیش از سقف حذف می‌شوند؛ VACUUM فضای فایل را هم آزاد می‌کند
+def _prune_cache(db):
+    db.execute("DELETE FROM cache WHERE ts < ?", (time.time() - CACHE_TTL,))
+    db.execute(
+        "DELETE FROM cache WHERE key NOT IN (SELECT key FROM cache ORDER BY ts DESC LIMIT ?)",
+        (CACHE_MAX_ENTRIES,)
+    )
+    db.commit()
+    db.execute("VACUUM")
+
+def _cache():
+    global _cache_db
+    if _cache_db is None:
+        _cache_db = sqlite3.connect(CACHE_FILE, check_same_thread=False)
+        _cache_db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, ts REAL, value TEXT)")
+        _prune_cache(_cache_db)
+        atexit.register(_cache_db.close)
+    return _cache_db
+
+def cache_get(name, text):
+    with _cache_lock:
+        row = _cache().execute(
+            "SELECT value FROM cache WHERE key = ? AND ts >= ?",
+            (_cache_key(name, text), time.time() - CACHE_TTL)
+        ).fetchone()
+    return row[0] if row else None
+
+def cache_put(name, text, value):
+    global _cache_puts
+    with _cache_lock:
+        db = _cache()
+        db.execute(
+            "INSERT OR REPLACE INTO cache (key, ts, value) VALUES (?, ?, ?)",
+            (_cache_key(name, text), time.time(), value)
+        )
+        db.commit()
+        _cache_puts += 1
+        if _cache_puts % CACHE_PRUNE_EVERY == 0:
+            _prune_cache(db)
+
+# فقط نتیجه‌های موفق کش می‌شوند؛ خطا (exception) ذخیره نمی‌شود.
+# آرگومان آخر متن است و بقیه (مثلاً آدرس سرویس) جزو کلید می‌شوند
+def disk_cached(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            *scope, text = args
+            key_name = "|".join([name, *scope])
+            hit = cache_get(key_name, text)
+            if hit is not None:
+                return hit
+            value = fn(*args)
+            cache_put(key_name, text, value)
+            return value
+        return wrapper
+    return decorator
 
 # --- فایل ذخیره عناوین ارسال‌شده ---
 POSTED_FILE = "posted.json"
 
+# --- کلید کوتاه عنوان (۶۴ بیت) به جای ذخیره کل عنوان ---
+_TITLE_KEY_RE = re.compile(r"[0-9a-f]{16}")
+
+def title_key(title):
+    return hashlib.blake2b(title.encode("utf-8"), digest_size=8).hexdigest()
+
 # --- لود عناوین قبلی ---
-if os.path.exists(POSTED_FILE):
-    with open(POSTED_FILE, "r") as f:
-        posted_titles = set(json.load(f))
-else:
-    posted_titles = set()
+MAX_POSTED = 5000
+
+# ساختار فایل: {"titles": {"<کلید ۱۶ حرفی>": زمان ارسال}, ...}
+def load_posted():
+    data = {}
+    if os.path.exists(POSTED_FILE):
+        with open(POSTED_FILE, "rb") as f:
+            data = _loads(f.read())
+    if isinstance(data, list):  # قالب قدیمی: لیست عنوان‌ها
+        data = {"titles": dict.fromkeys(data, 0)}
+    # عنوان‌های کامل قدیمی هم به کلید هش تبدیل می‌شوند تا دوباره پست نشوند
+    data["titles"] = {
+        k if _TITLE_KEY_RE.fullmatch(k) else title_key(k): ts
+        for k, ts in data.get("titles", {}).items()
+    }
+    return data
+
+posted = load_posted()
+posted_titles = posted["titles"]
+
+def save_posted():
+    # فقط MAX_POSTED کلید جدیدتر نگه داشته می‌شوند
+    if len(posted_titles) > MAX_POSTED:
+        keep = sorted(posted_titles.items(), key=lambda kv: kv[1])[-MAX_POSTED:]
+        posted_titles.clear()
+        posted_titles.update(keep)
+    with open(POSTED_FILE, "wb") as f:
+        f.write(_dumps(posted))
 
 # --- ترجمه ---
+TRANSLATE_URL = "https://api.mymemory.translated.net/get"
+
+@disk_cached("mymemory:en|fa")
+def _translate_remote(url, text):
+    print("🌐 شروع ترجمه با MyMemory...")
+    res = SESSION.get(url, params={"q": text, "langpair": "en|fa"}, timeout=15)
+    check_rate_limit(res, "MyMemory")
+    if res.status_code >= 500:
+        res.raise_for_status()
+    if res.status_code >= 400:
+        raise ValueError(f"MyMemory HTTP {res.status_code}")
+    data = _json(res)
+    try:
+        status = int(data.get("responseStatus"))
+    except (TypeError, ValueError):
+        status = 0
+    if status == 429:  # سهمیه روزانه تمام شده
+        raise RateLimited(f"MyMemory quota: {data.get('responseDetails')}")
+    if status >= 500:
+        raise requests.HTTPError(f"MyMemory status {status}: {data.get('responseDetails')}")
+    if status != 200:
+        # خطای مخصوص همین ورودی (مثل 403 برای متن بلندتر از ۵۰۰ حرف)؛ سرویس کنار گذاشته نمی‌شود
+        raise ValueError(f"MyMemory status {status}: {data.get('responseDetails')}")
+    t = (data.get("responseData") or {}).get("translatedText")
+    if not t or t == text:
+        raise ValueError("no translation returned")
+    return t
+
+# 429 و خطای شبکه/5xx بالا می‌روند تا post_news همان خبر را به نوبت بعد بسپارد،
+# نه اینکه متن انگلیسی در کانال فارسی منتشر شود
 def translate_text(text):
-    for url in [
-        "https://api.mymemory.translated.net/get",
-    ]:
-        try:
-            print("🌐 شروع ترجمه با MyMemory...")
-            res = requests.get(url, params={"q": text, "langpair": "en|fa"}, timeout=15)
-            data = res.json()
-            if "responseData" in data:
-                t = data["responseData"]["translatedText"]
-                if t and t != text:
-                    print("✅ ترجمه انجام شد.")
-                    return t
-        except Exception as e:
-            print(f"⚠️ خطا در ترجمه: {e}")
-    return text
+    try:
+        t = _translate_remote(TRANSLATE_URL, text)
+    except (RateLimited, requests.RequestException):
+        raise
+    except Exception as e:  # خطای مخصوص همین ورودی
+        print(f"⚠️ خطا در ترجمه: {e}")
+        return text
+    print("✅ ترجمه انجام شد.")
+    return t
+
+# عنوان و خلاصه با یک درخواست ترجمه می‌شوند اگر در سقف طول MyMemory جا شوند
+TRANSLATE_SEP = "@@@"
+MYMEMORY_MAX_CHARS = 500
+
+# متن بلند در مرز جمله‌ها به تکه‌های حداکثر MYMEMORY_MAX_CHARS حرفی شکسته می‌شود
+def split_for_translation(text, limit=MYMEMORY_MAX_CHARS):
+    chunks, cur = [], ""
+    for sent in text.replace(". ", ".\n").splitlines():
+        sent = sent.strip()
+        while len(sent) > limit:  # جمله‌ی خیلی بلند: برش در آخرین فاصله
+            cut = sent.rfind(" ", 0, limit)
+            cut = cut if cut > 0 else limit
+            if cur:
+                chunks.append(cur)
+                cur = ""
+            chunks.append(sent[:cut].strip())
+            sent = sent[cut:].strip()
+        if not sent:
+            continue
+        if cur and len(cur) + 1 + len(sent) > limit:
+            chunks.append(cur)
+            cur = sent
+        else:
+            cur = f"{cur} {sent}" if cur else sent
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+def translate_long(text):
+    if len(text) <= MYMEMORY_MAX_CHARS:
+        return translate_text(text)
+    return " ".join(translate_text(c) for c in split_for_translation(text))
+
+def translate_pair(title, summary):
+    joined = f"{title}\n{TRANSLATE_SEP}\n{summary}"
+    if len(joined) <= MYMEMORY_MAX_CHARS:
+        fa = translate_text(joined)
+        parts = fa.split(TRANSLATE_SEP)
+        if fa != joined and len(parts) == 2:
+            return parts[0].strip(), parts[1].strip()
+    return translate_long(title), translate_long(summary)
 
 # --- خلاصه ---
+# فقط نقطه‌ی پایان جمله (نقطه + فاصله)؛ اعداد اعشاری مثل 2.5 یا $70.5k شکسته نمی‌شوند
+_SENT_END_RE = re.compile(r"(?<=\.)\s+")
+
+def first_sentences(text, n=3):
+    # maxsplit فقط تا n جمله جلو می‌رود، نه کل متن
+    sents = [p.strip() for p in _SENT_END_RE.split(text, maxsplit=n)[:n] if p.strip()]
+    return " ".join(sents) if sents else text
+
+HF_URL = f"https://api-inference.huggingface.co/models/{HF_MODEL}"
+HF_HEADERS = {"Authorization": f"Bearer {HF_TOKEN}"}
+
+@disk_cached(HF_MODEL)
+def _summarize_remote(text):
+    r = SESSION.post(
+        HF_URL,
+        headers=HF_HEADERS,
+        json={"inputs": text[:2000]},
+        timeout=25
+    )
+    check_rate_limit(r, "HF")
+    data = _json(r)
+    if isinstance(data, list) and len(data) and "summary_text" in data[0]:
+        return data[0]["summary_text"]
+    raise ValueError(f"unexpected HF response: {str(data)[:200]}")
+
 def summarize_text(text):
     try:
-        r = requests.post(
-            f"https://api-inference.huggingface.co/models/{HF_MODEL}",
-            headers={"Authorization": f"Bearer {HF_TOKEN}"},
-            json={"inputs": text[:2000]},
-            timeout=25
-        )
-        data = r.json()
-        if isinstance(data, list) and len(data) and "summary_text" in data[0]:
-            return data[0]["summary_text"]
+        return _summarize_remote(text)
     except Exception as e:
         print("HF summarize error:", e)
-    return text
+    return first_sentences(text)
+
+# همه متن‌ها در یک درخواست HF؛ هر آیتمی که جواب نگیرد جداگانه خلاصه می‌شود
+def summarize_batch(texts):
+    results = [cache_get(HF_MODEL, t) for t in texts]
+    pending = [i for i, s in enumerate(results) if s is None]
+    if not pending:
+        return results
+    fallback = summarize_text
+    try:
+        r = SESSION.post(
+            HF_URL,
+            headers=HF_HEADERS,
+            json={"inputs": [texts[i][:2000] for i in pending]},
+            timeout=40
+        )
+        check_rate_limit(r, "HF")
+        data = _json(r)
+        if isinstance(data, list) and len(data) == len(pending):
+            for i, d in zip(pending, data):
+                if isinstance(d, list) and d:
+                    d = d[0]
+                if isinstance(d, dict) and d.get("summary_text"):
+                    results[i] = d["summary_text"]
+                    cache_put(HF_MODEL, texts[i], results[i])
+        else:
+            print("HF batch summarize error:", str(data)[:200])
+    except RateLimited as e:
+        # درخواست جداگانه هم 429 می‌گیرد؛ مستقیم سراغ چند جمله‌ی اول می‌رویم
+        print("HF batch summarize error:", e)
+        fallback = first_sentences
+    except Exception as e:
+        print("HF batch summarize error:", e)
+    # خلاصه‌سازی جداگانه‌ی آیتم‌های جامانده هم موازی انجام می‌شود
+    missing = [i for i, s in enumerate(results) if s is None]
+    for i, summary in zip(missing, EXECUTOR.map(fallback, [texts[i] for i in missing])):
+        results[i] = summary
+    return results
 
 # --- ارسال تلگرام ---
+_HTML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"})
+
+def escape_html(s):
+    return s.translate(_HTML_ESCAPE)
+
+_TG_SEND_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+_TG_BASE_PAYLOAD = {"chat_id": CHAT_ID, "parse_mode": "HTML", "disable_web_page_preview": True}
+_TG_JSON_HEADERS = {"Content-Type": "application/json; charset=utf-8"}
+
+# سطل توکن: فقط وقتی از سقف تلگرام (۱ پیام در ثانیه برای هر چت) جلو بزنیم صبر می‌کند
+class RateLimiter:
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self.allowance = rate
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            self.allowance = min(self.rate, self.allowance + (now - self.last) * self.rate / self.per)
+            self.last = now
+            if self.allowance < 1:
+                time.sleep((1 - self.allowance) * self.per / self.rate)
+                self.allowance = 0
+                self.last = time.monotonic()
+            else:
+                self.allowance -= 1
+
+TG_LIMITER = RateLimiter(1, 1)
+
 def send_message(msg):
+    TG_LIMITER.wait()
     try:
-        requests.post(
-            f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage",
-            data={"chat_id": CHAT_ID, "text": msg, "parse_mode": "HTML", "disable_web_page_preview": True},
-            timeout=10
-        )
-        print("✅ Sent to Telegram")
+        # UTF-8 خام؛ json= در requests متن فارسی را به \uXXXX تبدیل می‌کند
+        body = json.dumps({**_TG_BASE_PAYLOAD, "text": msg}, ensure_ascii=False).encode("utf-8")
+        r = SESSION.post(_TG_SEND_URL, data=body, headers=_TG_JSON_HEADERS, timeout=10)
     except Exception as e:
         print("Telegram send error:", e)
+        return False
+    check_rate_limit(r, "Telegram")
+    if r.ok:
+        print("✅ Sent to Telegram")
+        return True
+    print("Telegram send error:", r.status_code, r.text[:200])
+    return False
 
 # --- دریافت خبر ---
-def fetch_latest_news():
+# ETag/Last-Modified در posted.json ذخیره می‌شوند تا بعد از ری‌استارت هم معتبر بمانند؛
+# مقدار تازه تا ارسال همه‌ی خبرهای جدید در pending_validators می‌ماند
+_feed_cache = {"items": [], "pending_validators": None}
+
+def fetch_latest_news(limit=3):  # فقط ۳ تا خبر جدید
     print("🛰 بررسی فید...")
-    feed = feedparser.parse(NEWS_FEED_URL)
     news = []
-    for entry in feed.entries[:3]:  # فقط ۳ تا خبر جدید
-        news.append({
-            "title": entry.title,
-            "link": entry.link,
-            "summary": getattr(entry, "summary", "")
-        })
+    try:
+        headers = {}
+        if posted.get("feed_etag"):
+            headers["If-None-Match"] = posted["feed_etag"]
+        if posted.get("feed_modified"):
+            headers["If-Modified-Since"] = posted["feed_modified"]
+        with SESSION.get(NEWS_FEED_URL, headers=headers, timeout=10, stream=True) as r:
+            if r.status_code == 304:
+                print("📡 فید تغییری نکرده است.")
+                return _feed_cache["items"]
+            r.raise_for_status()
+            r.raw.decode_content = True  # gzip را خود urllib3 باز می‌کند
+            # پارس جریانی: بعد از رسیدن به limit آیتم، بقیه فید دانلود نمی‌شود
+            for _, elem in ElementTree.iterparse(r.raw, events=("end",)):
+                if elem.tag != "item":
+                    continue
+                news.append({
+                    "title": (elem.findtext("title") or "").strip(),
+                    "link": (elem.findtext("link") or "").strip(),
+                    "summary": (elem.findtext("description") or "").strip()
+                })
+                elem.clear()
+                if len(news) >= limit:
+                    break
+        _feed_cache["pending_validators"] = (r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        _feed_cache["items"] = news
+    except Exception as e:
+        print("Feed error:", e)
     print(f"📡 تعداد خبرها: {len(news)}")
     return news
 
 # --- ارسال اخبار ---
+NEWS_HASHTAGS = "#کریپتو #اخبار_کریپتو #Bitcoin #Ethereum"
+NEWS_FOOTER = CHANNEL_FOOTER + "\n" + NEWS_HASHTAGS
+NEWS_SEPARATOR = "\n\n────────\n\n"
+MAX_MESSAGE_LEN = 4000  # سقف تلگرام ۴۰۹۶ کاراکتر است
+_NEWS_TPL = "📢 <b>{title}</b>\n\n📝 {summary}\n\n🔗 <a href='{link}'>ادامه مطلب</a>".format_map
+
+# چند خبر را تا جای ممکن در یک پیام جمع می‌کند؛ خروجی: [(متن پیام، اندیس خبرها)]
+BODY_BUDGET = MAX_MESSAGE_LEN - len(NEWS_FOOTER) - 2  # جای یک خبر تنها در یک پیام
+
+# متن escape‌شده را کوتاه می‌کند بدون اینکه وسط یک entity مثل &amp; بریده شود
+def truncate_html(s, limit):
+    if len(s) <= limit:
+        return s
+    cut = s[:max(limit - 1, 0)]
+    amp = cut.rfind("&")
+    if amp > cut.rfind(";"):
+        cut = cut[:amp]
+    return cut + "…"
+
+def render_news(fa_title, fa_summary, link):
+    fa_title = truncate_html(fa_title, BODY_BUDGET // 4)
+    room = BODY_BUDGET - len(_NEWS_TPL({"title": fa_title, "summary": "", "link": link}))
+    return _NEWS_TPL({"title": fa_title, "summary": truncate_html(fa_summary, max(room, 0)), "link": link})
+
+def pack_messages(bodies):
+    budget = BODY_BUDGET
+    chunks, cur, size = [], [], 0
+    for i, body in enumerate(bodies):
+        extra = len(body) + (len(NEWS_SEPARATOR) if cur else 0)
+        if cur and size + extra > budget:
+            chunks.append(cur)
+            cur, size, extra = [], 0, len(body)
+        cur.append(i)
+        size += extra
+    if cur:
+        chunks.append(cur)
+    return [(NEWS_SEPARATOR.join(bodies[i] for i in idx) + "\n\n" + NEWS_FOOTER, idx) for idx in chunks]
+
 def post_news():
     print("🚀 اجرای بررسی اخبار...")
-    global posted_titles
     news_items = fetch_latest_news()
+    fresh, seen = [], set()
     for n in news_items:
-        if n["title"] in posted_titles:
+        key = title_key(n["title"])
+        if key in posted_titles or key in seen:
             print("⏩ تکراری، رد شد:", n["title"])
             continue
-        print(f"📰 ارسال خبر: {n['title'][:50]}...")
+        seen.add(key)
+        fresh.append(n)
 
-        summary = summarize_text(n["summary"])
-        fa_title = translate_text(n["title"])
-        fa_summary = translate_text(summary)
+    # خلاصه‌سازی و ترجمه‌ها موازی اجرا می‌شوند؛ ارسال به تلگرام ترتیبی می‌ماند
+    summaries = summarize_batch([n["summary"] or n["title"] for n in fresh])
+    futures = [EXECUTOR.submit(translate_pair, n["title"], s) for n, s in zip(fresh, summaries)]
 
-        hashtags = "#کریپتو #اخبار_کریپتو #Bitcoin #Ethereum"
-        msg = f"📢 <b>{fa_title}</b>\n\n📝 {fa_summary}\n\n🔗 <a href='{n['link']}'>ادامه مطلب</a>\n\n👥 @Crypto_Zone360\nبه ما بپیوندید 🦈\n{hashtags}"
-        send_message(msg)
-        posted_titles.add(n["title"])
+    # با 429 مترجم، فقط خبرهای ترجمه‌شده‌ی قبل از آن ارسال می‌شوند و بقیه ثبت نمی‌شوند
+    ready, bodies = [], []
+    for n, f in zip(fresh, futures):
+        print(f"📰 آماده‌سازی خبر: {n['title'][:50]}...")
+        try:
+            fa_title, fa_summary = map(escape_html, f.result())
+        except RateLimited as e:
+            print(f"⛔ {e}؛ بقیه خبرها در نوبت بعد ترجمه می‌شوند")
+            for pending in futures:
+                pending.cancel()
+            break
+        except requests.RequestException as e:
+            print(f"⚠️ ترجمه در دسترس نیست، خبر به نوبت بعد می‌ماند: {e}")
+            continue
+        ready.append(n)
+        bodies.append(render_news(fa_title, fa_summary, escape_html(n["link"])))
 
-    # ذخیره عناوین جدید
-    with open(POSTED_FILE, "w") as f:
-        json.dump(list(posted_titles), f)
+    # خبرها در کمترین تعداد پیام ارسال می‌شوند
+    sent = False
+    for msg, idx in pack_messages(bodies):
+        try:
+            ok = send_message(msg)
+        except RateLimited as e:
+            print(f"⛔ {e}؛ بقیه پیام‌ها در نوبت بعد ارسال می‌شوند")
+            break
+        if ok:
+            sent = True
+            for i in idx:
+                posted_titles[title_key(ready[i]["title"])] = int(time.time())
+
+    # ETag فقط وقتی ثبت می‌شود که همه‌ی خبرهای جدید ارسال شده باشند؛
+    # وگرنه بعد از ری‌استارت پاسخ 304 خبرهای جامانده را حذف می‌کرد
+    validators = _feed_cache["pending_validators"]
+    committed = False
+    if validators and all(title_key(n["title"]) in posted_titles for n in fresh):
+        posted["feed_etag"], posted["feed_modified"] = validators
+        _feed_cache["pending_validators"] = None
+        committed = True
+
+    # ذخیره عناوین جدید (فقط وقتی چیزی تغییر کرده)
+    if sent or committed:
+        save_posted()
 
 # --- تحلیل تکنیکال ---
+COINS = ("BTC", "ETH", "SOL", "TON", "XRP", "BNB")
+_TREND = {True: "📈 صعودی", False: "📉 نزولی"}
+_TECH_LINE = "{sym}: ${price:,.2f} ({chg:+.2f}%) {trend}".format
+NO_DATA = "داده در دسترس نیست"
+
+def get_technical_batch(symbols):
+    try:
+        raw = _json(SESSION.get(
+            "https://min-api.cryptocompare.com/data/pricemultifull",
+            params={"fsyms": ",".join(symbols), "tsyms": "USD"},
+            timeout=10
+        ))["RAW"]
+    except Exception as e:
+        print("CryptoCompare error:", e)
+        raw = {}
+    results = []
+    for symbol in symbols:
+        try:
+            usd = raw[symbol]["USD"]
+            change = usd["CHANGEPCT24HOUR"]
+            results.append(_TECH_LINE(sym=symbol, price=usd["PRICE"], chg=change, trend=_TREND[change > 0]))
+        except (KeyError, TypeError):
+            results.append(f"{symbol}: {NO_DATA}")
+    return results
+
 def get_technical_analysis(symbol):
+    return get_technical_batch([symbol])[0]
+
+def get_closes(symbol, limit=100):
     try:
-        url = f"https://min-api.cryptocompare.com/data/pricemultifull?fsyms={symbol}&tsyms=USD"
-        data = requests.get(url, timeout=10).json()
-        price = data["RAW"][symbol]["USD"]["PRICE"]
-        change = data["RAW"][symbol]["USD"]["CHANGEPCT24HOUR"]
-        status = "📈 صعودی" if change > 0 else "📉 نزولی"
-        return f"{symbol}: ${price:,.2f} ({change:.2f}%) {status}"
-    except:
-        return f"{symbol}: داده در دسترس نیست"
+        data = _json(SESSION.get(
+            "https://min-api.cryptocompare.com/data/v2/histohour",
+            params={"fsym": symbol, "tsym": "USD", "limit": limit},
+            timeout=10
+        ))
+        return [c["close"] for c in data["Data"]["Data"]]
+    except Exception as e:
+        print(f"CryptoCompare history error ({symbol}):", e)
+        return []
+
+# RSI با میانگین Wilder در یک پیمایش
+def rsi(closes, period=14):
+    if len(closes) <= period:
+        return None
+    gain = loss = 0.0
+    for prev, cur in zip(closes, closes[1:period + 1]):
+        d = cur - prev
+        if d > 0:
+            gain += d
+        else:
+            loss -= d
+    avg_gain, avg_loss = gain / period, loss / period
+    for prev, cur in zip(closes[period:], closes[period + 1:]):
+        d = cur - prev
+        avg_gain = (avg_gain * (period - 1) + (d if d > 0 else 0.0)) / period
+        avg_loss = (avg_loss * (period - 1) + (-d if d < 0 else 0.0)) / period
+    if avg_loss == 0:
+        return 50.0 if avg_gain == 0 else 100.0  # سری بی‌تغییر: خنثی
+    return 100 - 100 / (1 + avg_gain / avg_loss)
 
 def post_daily_analysis():
     print("📊 ارسال تحلیل تکنیکال...")
-    coins = ["BTC", "ETH", "SOL", "TON", "XRP", "BNB"]
-    results = [get_technical_analysis(c) for c in coins]
+    histories = EXECUTOR.map(get_closes, COINS)
+    results = get_technical_batch(COINS)
+    results = [
+        line if r is None or line.endswith(NO_DATA) else f"{line} | RSI14: {r:.1f}"
+        for line, r in zip(results, map(rsi, histories))
+    ]
     hashtags = "#تحلیل_تکنیکال #کریپتو #Bitcoin #Ethereum"
-    msg = "📊 تحلیل تکنیکال روزانه بازار:\n\n" + "\n".join(results) + f"\n\n⚠️ مسئولیت استفاده با کاربر است.\n\n👥 @Crypto_Zone360\nبه ما بپیوندید 🦈\n{hashtags}"
+    msg = "📊 تحلیل تکنیکال روزانه بازار:\n\n" + "\n".join(results) + f"\n\n⚠️ مسئولیت استفاده با کاربر است.\n\n{CHANNEL_FOOTER}\n{hashtags}"
     send_message(msg)
 
 # --- زمان‌بندی ---
-scheduler = BlockingScheduler(timezone=pytz.timezone("Asia/Tehran"))
-scheduler.add_job(post_news, "interval", minutes=20)
-scheduler.add_job(post_daily_analysis, "cron", hour=8, minute=0)
+TZ = ZoneInfo("Asia/Tehran")
+NEWS_INTERVAL = 20 * 60  # ثانیه
+scheduler = sched.scheduler(time.time, time.sleep)
+
+def next_daily_run(hour=8, minute=0):
+    now = datetime.now(TZ)
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return target.timestamp()
+
+def run_job(job):
+    try:
+        job()
+    except Exception as e:
+        print(f"⚠️ خطا در اجرای {job.__name__}: {e}")
+
+def news_job():
+    scheduler.enter(NEWS_INTERVAL, 1, news_job)
+    run_job(post_news)
+
+def daily_job():
+    scheduler.enterabs(next_daily_run(), 1, daily_job)
+    run_job(post_daily_analysis)
 
 if __name__ == "__main__":
     print("✅ Bot run started...")
-    post_news()  # اجرای فوری بار اول
-    scheduler.start()
+    scheduler.enterabs(next_daily_run(), 1, daily_job)
+    news_job()  # اجرای فوری بار اول
+    scheduler.run()
@@ -0,0 +1,17 @@
+from run_once import first_sentences
+
+
+def test_first_sentences_keeps_decimals():
+    text = "Bitcoin rose 2.5% to $70.5k on Monday. ETF inflows hit $1.2B. Analysts expect more. Extra sentence."
+    assert first_sentences(text) == "Bitcoin rose 2.5% to $70.5k on Monday. ETF inflows hit $1.2B. Analysts expect more."
+
+
+def test_first_sentences_without_period_returns_text():
+    assert first_sentences("no period here") == "no period here"
+    assert first_sentences("") == ""
+
+
+if __name__ == "__main__":
+    test_first_sentences_keeps_decimals()
+    test_first_sentences_without_period_returns_text()
+    print("✅ first_sentences ok")
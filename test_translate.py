@@ -1,4 +1,5 @@
 import requests
+from concurrent.futures import ThreadPoolExecutor
 
 text = "Bitcoin price rises above $70,000 as ETF inflows surge."
 apis = [
@@ -7,11 +8,17 @@ apis = [
     "https://translate.argosopentech.com/translate"
 ]
 
-for api in apis:
+def probe(api):
+    lines = [f"\n🔗 Testing {api}"]
     try:
-        print(f"\n🔗 Testing {api}")
         res = requests.post(api, json={"q": text, "source": "en", "target": "fa"}, timeout=15)
-        print("✅ Status:", res.status_code)
-        print("Response:", res.text[:300])
+        lines.append(f"✅ Status: {res.status_code}")
+        lines.append(f"Response: {res.text[:300]}")
     except Exception as e:
-        print("❌ Error:", e)
+        lines.append(f"❌ Error: {e}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    with ThreadPoolExecutor(len(apis)) as ex:
+        for report in ex.map(probe, apis):
+            print(report)